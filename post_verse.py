@@ -1,45 +1,121 @@
 import tweepy
 import csv
 import random
+import math
 import os
+from functools import lru_cache
+from itertools import count
 from pathlib import Path
 from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
 import textwrap
 
+# Exponential decay for rank weights: weight = e^(-i/200)
+# This heavily favors early verses but still gives chances to later ones
+WEIGHT_DECAY = 200
+
+# Rank weights never change, so compute them once for a full verse list
+MAX_VERSES = 1000
+RANK_WEIGHTS = tuple(math.exp(-i / WEIGHT_DECAY) for i in range(MAX_VERSES))
+
+# Gradient backgrounds used when there are no background images
+GRADIENTS = [
+    ((41, 128, 185), (52, 73, 94)),    # Peaceful blues
+    ((255, 94, 77), (200, 70, 120)),   # Warm sunset
+    ((106, 17, 203), (37, 117, 252)),  # Purple twilight
+    ((34, 139, 34), (0, 100, 0)),      # Forest green
+    ((0, 150, 136), (0, 105, 92)),     # Ocean teal
+]
+
+# Random generator for verse selection, created once per process
+_RNG = random.Random()
+
+# Posted references from the last read of the posted file, keyed by its stat
+_POSTED_CACHE = {'key': None, 'set': None}
+
 def load_verses(csv_file='bible_verses.csv'):
-    """Load all Bible verses from CSV file"""
-    verses = []
-    with open(csv_file, 'r', encoding='utf-8') as f:
-        reader = csv.DictReader(f)
-        verses = list(reader)
-    return verses
+    """Load all Bible verses from CSV file as parallel columns, along with a reference -> index lookup"""
+    with open(csv_file, 'r', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        ref_col = header.index('reference')
+        text_col = header.index('text')
+        
+        # Append each row straight into its column (no dict per row)
+        references = []
+        texts = []
+        for row in reader:
+            # Skip blank lines like DictReader does, and rows missing a field
+            if len(row) <= max(ref_col, text_col):
+                continue
+            references.append(row[ref_col])
+            texts.append(row[text_col])
+    verses = {'reference': references, 'text': texts}
+    # Derive tweet lengths once so selection never has to build the tweets:
+    # format_tweet adds " - " between the text and the reference
+    verses['length'] = [len(text) + len(reference) + 3
+                        for text, reference in zip(verses['text'], verses['reference'])]
+    ref_to_idx = {reference: i for i, reference in enumerate(verses['reference'])}
+    return verses, ref_to_idx
 
 def load_posted_verses(posted_file='posted_verses.txt'):
-    """Load list of already posted verse references"""
-    if not os.path.exists(posted_file):
+    """Load the set of already posted verse references (cached until the file changes)"""
+    try:
+        stat = os.stat(posted_file)
+    except FileNotFoundError:
         return set()
     
+    key = (posted_file, stat.st_mtime_ns, stat.st_size)
+    if _POSTED_CACHE['key'] == key:
+        return _POSTED_CACHE['set']
+    
+    # Lines are saved as "reference|date"; only the reference is matched on
     with open(posted_file, 'r', encoding='utf-8') as f:
-        return set(line.strip() for line in f if line.strip())
+        posted = {line.split('|', 1)[0] for line in f.read().splitlines() if line}
+    
+    _POSTED_CACHE['key'] = key
+    _POSTED_CACHE['set'] = posted
+    return posted
+
+def save_posted_verses(references, posted_file='posted_verses.txt'):
+    """Add several verse references to the posted list with timestamp in one write"""
+    timestamp = datetime.now().strftime('%Y-%m-%d')
+    buffer = ''.join(f"{reference}|{timestamp}\n" for reference in references)
+    if not buffer:
+        return
+    with open(posted_file, 'a', encoding='utf-8', buffering=1 << 16) as f:
+        f.write(buffer)
 
 def save_posted_verse(reference, posted_file='posted_verses.txt'):
     """Add a verse reference to the posted list with timestamp"""
-    timestamp = datetime.now().strftime('%Y-%m-%d')
-    with open(posted_file, 'a', encoding='utf-8') as f:
-        f.write(f"{reference}|{timestamp}\n")
+    save_posted_verses([reference], posted_file)
 
 def reset_if_new_year(posted_file='posted_verses.txt'):
     """Reset posted verses if it's a new year"""
-    if not os.path.exists(posted_file):
-        return
+    current_year = datetime.now().strftime('%Y')
+    
+    # Skip the check if it has already been done this year
+    year_file = f"{posted_file}.year"
+    try:
+        with open(year_file, 'r', encoding='utf-8') as f:
+            if f.read().strip() == current_year:
+                return
+    except OSError:
+        pass
+    
+    if os.path.exists(posted_file):
+        check_posted_year(posted_file, current_year)
     
+    with open(year_file, 'w', encoding='utf-8') as f:
+        f.write(current_year)
+
+def check_posted_year(posted_file, current_year):
+    """Back up the posted verses file if its first entry is from a past year"""
     # Check the first line for the year
     with open(posted_file, 'r', encoding='utf-8') as f:
         first_line = f.readline().strip()
         if '|' in first_line:
             last_year = first_line.split('|')[1].split('-')[0]
-            current_year = datetime.now().strftime('%Y')
             
             if last_year != current_year:
                 print(f"New year detected! Resetting posted verses from {last_year}")
@@ -48,10 +124,10 @@ def reset_if_new_year(posted_file='posted_verses.txt'):
                 os.rename(posted_file, backup_file)
                 print(f"Backed up to {backup_file}")
 
-def format_tweet(verse):
-    """Format verse for Twitter (280 char limit)"""
-    reference = verse['reference']
-    text = verse['text']
+def format_tweet(verses, i):
+    """Format verse i for Twitter (280 char limit)"""
+    reference = verses['reference'][i]
+    text = verses['text'][i]
     
     # Format: text - Reference (no quotes)
     tweet = f'{text} - {reference}'
@@ -60,18 +136,39 @@ def format_tweet(verse):
 
 def create_gradient(width, height, color1, color2):
     """Create a vertical gradient from color1 to color2"""
-    base = Image.new('RGB', (width, height), color1)
-    top = Image.new('RGB', (width, height), color2)
-    mask = Image.new('L', (width, height))
-    mask_data = []
+    # Blend a single pixel column, then let PIL stretch it across the width
+    column = bytearray()
     for y in range(height):
-        mask_data.extend([int(255 * (y / height))] * width)
-    mask.putdata(mask_data)
-    base.paste(top, (0, 0), mask)
-    return base
+        t = y / height
+        column.extend(round(c1 + (c2 - c1) * t) for c1, c2 in zip(color1, color2))
+    column = Image.frombytes('RGB', (1, height), bytes(column))
+    return column.resize((width, height), Image.Resampling.NEAREST)
 
-def get_font(size, font_type='verse'):
-    """Try to load a nice font, fallback to default if not available"""
+def load_gradient(index, width, height, gradients_dir='gradients'):
+    """Open a pre-rendered gradient background, rendering (and trying to save) it if missing"""
+    gradient_path = os.path.join(gradients_dir, f'{index}.png')
+    try:
+        with Image.open(gradient_path) as template:
+            if template.size == (width, height):
+                return template.copy()
+    except OSError:
+        pass
+    
+    color1, color2 = GRADIENTS[index]
+    img = create_gradient(width, height, color1, color2)
+    
+    # Saving the template is only a cache; a read-only checkout still posts
+    try:
+        os.makedirs(gradients_dir, exist_ok=True)
+        img.save(gradient_path)
+    except OSError as e:
+        print(f"Could not save gradient template {gradient_path}: {e}")
+    return img
+
+@lru_cache(maxsize=1)
+def get_font_path():
+    """Find the first font file that loads, or None if only the default font is available"""
+    candidates = []
     
     # Check for custom fonts in fonts/ directory
     fonts_dir = 'fonts'
@@ -80,14 +177,10 @@ def get_font(size, font_type='verse'):
                        if f.lower().endswith(('.ttf', '.otf'))]
         if custom_fonts:
             # Use first available custom font
-            font_path = os.path.join(fonts_dir, custom_fonts[0])
-            try:
-                return ImageFont.truetype(font_path, size)
-            except:
-                pass
+            candidates.append(os.path.join(fonts_dir, custom_fonts[0]))
     
     # System font options (fallback)
-    font_options = [
+    candidates.extend([
         # macOS fonts
         '/System/Library/Fonts/Supplemental/Arial.ttf',
         '/System/Library/Fonts/Helvetica.ttc',
@@ -100,15 +193,24 @@ def get_font(size, font_type='verse'):
         'C:\\Windows\\Fonts\\Arial.ttf',
         'C:\\Windows\\Fonts\\calibri.ttf',
         'C:\\Windows\\Fonts\\Georgia.ttf',
-    ]
+    ])
     
-    for font_path in font_options:
+    for font_path in candidates:
         try:
-            return ImageFont.truetype(font_path, size)
+            ImageFont.truetype(font_path)
+            return font_path
         except:
             continue
     
-    return ImageFont.load_default()
+    return None
+
+@lru_cache(maxsize=8)
+def get_font(size, font_type='verse'):
+    """Try to load a nice font, fallback to default if not available"""
+    font_path = get_font_path()
+    if font_path is None:
+        return ImageFont.load_default()
+    return ImageFont.truetype(font_path, size)
 
 def create_verse_image(verse_text, reference, output_path='verse_image.png'):
     """Create an image with verse text and reference on a background"""
@@ -140,16 +242,8 @@ def create_verse_image(verse_text, reference, output_path='verse_image.png'):
             use_image_background = False
     
     if not use_image_background:
-        # Fallback to gradient backgrounds
-        gradients = [
-            ((41, 128, 185), (52, 73, 94)),    # Peaceful blues
-            ((255, 94, 77), (200, 70, 120)),   # Warm sunset
-            ((106, 17, 203), (37, 117, 252)),  # Purple twilight
-            ((34, 139, 34), (0, 100, 0)),      # Forest green
-            ((0, 150, 136), (0, 105, 92)),     # Ocean teal
-        ]
-        color1, color2 = random.choice(gradients)
-        img = create_gradient(width, height, color1, color2)
+        # Fallback to pre-rendered gradient backgrounds
+        img = load_gradient(random.randrange(len(GRADIENTS)), width, height)
     
     draw = ImageDraw.Draw(img)
     
@@ -193,45 +287,55 @@ def create_verse_image(verse_text, reference, output_path='verse_image.png'):
         anchor='ma'
     )
     
-    img.save(output_path, quality=95)
+    # Fast zlib level: PNG encoding otherwise dominates the image step
+    img.save(output_path, format='PNG', compress_level=1)
     return output_path
 
-def select_valid_verse(verses, max_attempts=50):
+def rank_weights():
+    """Yield the weight of each rank in order, from the precomputed table first"""
+    yield from RANK_WEIGHTS
+    for i in count(len(RANK_WEIGHTS)):
+        yield math.exp(-i / WEIGHT_DECAY)
+
+def select_valid_verse(verses, ref_to_idx):
     """Select a random verse that fits within 280 characters and hasn't been posted this year.
-    Uses weighted selection to favor top-ranked verses (earlier in the list)."""
+    Uses weighted selection to favor top-ranked verses (earlier in the list).
+    Returns the index of the chosen verse and its tweet text."""
     posted = load_posted_verses()
     
-    # Filter out already posted verses
-    available_verses = [v for v in verses if v['reference'] not in posted]
+    # Filter out already posted verses by marking them off via the index,
+    # which only touches the (usually few) posted references
+    available = [True] * len(verses['reference'])
+    for reference in posted:
+        i = ref_to_idx.get(reference)
+        if i is not None:
+            available[i] = False
+    available_idx = [i for i, ok in enumerate(available) if ok]
     
-    if not available_verses:
+    if not available_idx:
         print("All verses have been posted this year! Resetting...")
-        available_verses = verses
-    
-    print(f"Available verses: {len(available_verses)} (Posted this year: {len(posted)})")
-    
-    # Create weights that decay as we go down the list
-    # Top 100 get highest weight, then it drops off
-    weights = []
-    for i in range(len(available_verses)):
-        # Exponential decay: weight = e^(-i/200)
-        # This heavily favors early verses but still gives chances to later ones
-        weight = 2.718 ** (-i / 200)
-        weights.append(weight)
-    
-    for _ in range(max_attempts):
-        # Use weighted random choice
-        verse = random.choices(available_verses, weights=weights, k=1)[0]
-        tweet = format_tweet(verse)
-        
-        if len(tweet) <= 280:
-            return verse, tweet
+        available_idx = list(range(len(available)))
+    
+    print(f"Available verses: {len(available_idx)} (Posted this year: {len(posted)})")
     
-    # If we can't find one after max_attempts, raise an error
-    raise Exception(f"Could not find a verse under 280 characters after {max_attempts} attempts")
+    # Weights decay as we go down the list, so top-ranked verses are favored.
+    # Verses that don't fit in a tweet are dropped up front, keeping their rank.
+    lengths = verses['length']
+    candidates = [(i, weight) for i, weight in zip(available_idx, rank_weights())
+                  if lengths[i] <= 280]
+    
+    if not candidates:
+        raise Exception("Could not find an available verse under 280 characters")
+    
+    # Weighted random choice in a single pass (Efraimidis-Spirakis): the
+    # largest key log(u)/weight wins, i.e. the smallest exponential draw
+    # over weight, so no retries are needed
+    i, _ = min(candidates, key=lambda c: _RNG.expovariate(1.0) / c[1])
+    return i, format_tweet(verses, i)
 
-def post_to_twitter(tweet_text, image_path=None):
-    """Post tweet using Twitter API v2 with optional image"""
+@lru_cache(maxsize=1)
+def get_twitter_clients():
+    """Build the authenticated Twitter clients once and reuse them for every post"""
     
     api_key = os.environ.get('TWITTER_API_KEY')
     api_secret = os.environ.get('TWITTER_API_SECRET')
@@ -244,6 +348,21 @@ def post_to_twitter(tweet_text, image_path=None):
     )
     api_v1 = tweepy.API(auth)
     
+    # API v2 client for posting tweets
+    client = tweepy.Client(
+        consumer_key=api_key,
+        consumer_secret=api_secret,
+        access_token=access_token,
+        access_token_secret=access_token_secret
+    )
+    
+    return api_v1, client
+
+def post_to_twitter(tweet_text, image_path=None):
+    """Post tweet using Twitter API v2 with optional image"""
+    
+    api_v1, client = get_twitter_clients()
+    
     # Upload media if image provided
     media_id = None
     if image_path and os.path.exists(image_path):
@@ -252,13 +371,6 @@ def post_to_twitter(tweet_text, image_path=None):
         print(f"Uploaded image with media_id: {media_id}")
     
     # Post tweet with image
-    client = tweepy.Client(
-        consumer_key=api_key,
-        consumer_secret=api_secret,
-        access_token=access_token,
-        access_token_secret=access_token_secret
-    )
-    
     if media_id:
         response = client.create_tweet(text=tweet_text, media_ids=[media_id])
     else:
@@ -274,18 +386,19 @@ def main():
         
         # Load all verses
         print("Loading Bible verses...")
-        verses = load_verses()
-        print(f"Loaded {len(verses)} verses")
+        verses, ref_to_idx = load_verses()
+        print(f"Loaded {len(verses['reference'])} verses")
         
         # Select random verse that fits in 280 characters and hasn't been posted
         print("Selecting a verse that fits in 280 characters...")
-        verse, tweet_text = select_valid_verse(verses)
-        print(f"Selected: {verse['reference']}")
+        i, tweet_text = select_valid_verse(verses, ref_to_idx)
+        reference = verses['reference'][i]
+        print(f"Selected: {reference}")
         print(f"Tweet text ({len(tweet_text)} chars):\n{tweet_text}")
         
         # Create image
         print("\nCreating verse image...")
-        image_path = create_verse_image(verse['text'], verse['reference'])
+        image_path = create_verse_image(verses['text'][i], reference)
         print(f"Image created: {image_path}")
         
         # Post to Twitter with image
@@ -299,8 +412,8 @@ def main():
             print("Cleaned up image file")
         
         # Mark this verse as posted
-        save_posted_verse(verse['reference'])
-        print(f"Marked {verse['reference']} as posted")
+        save_posted_verse(reference)
+        print(f"Marked {reference} as posted")
         
     except FileNotFoundError:
         print("Error: bible_verses.csv not found!")
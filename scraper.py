@@ -1,95 +1,148 @@
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from lxml import etree, html
 import csv
 import time
 import re
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 
-def scrape_bible_verses():
-    """Scrape top 1000 Bible verses from topverses.com and save to CSV"""
-    
+BASE_URL = "https://www.topverses.com/Bible/&pg={}&a=ajax"
+
+# Pages 1-100 should give us 1000 verses (10 per page)
+PAGES = range(1, 101)
+
+# Worker threads fetch and parse pages; only some may hit the site at once
+MAX_WORKERS = 8
+MAX_CONCURRENT_REQUESTS = 4
+_request_slots = threading.Semaphore(MAX_CONCURRENT_REQUESTS)
+
+# Pages fetched ahead of the CSV writer; bounds how many results are held
+MAX_PAGES_AHEAD = 2 * MAX_WORKERS
+
+# Everything before the first line that is only a translation label
+_NIV_RE = re.compile(r'\A(.*?)(?:^[^\S\n]*(?:NIV|AMP|KJV)[^\S\n]*$|\Z)', re.DOTALL | re.MULTILINE)
+
+# The first sibling after a verse header that isn't its "Bible Rank" label
+_VERSE_ELEM_XPATH = etree.XPath('following-sibling::*[not(contains(., "Bible Rank"))][1]')
+
+def parse_verses(content, encoding='utf-8'):
+    """Extract the verses (reference and NIV text) from one page of results"""
     verses = []
-    base_url = "https://www.topverses.com/Bible/&pg={}&a=ajax"
+    if not content.strip():
+        return verses
     
-    # Pages 1-100 should give us 1000 verses (10 per page)
-    for page in range(1, 101):
-        url = base_url.format(page)
-        
-        print(f"Scraping page {page}/100...")
-        
+    try:
+        # The pages are fragments without a <meta charset>, so say how to
+        # decode them; lxml would otherwise read the bytes as Latin-1
+        tree = html.fromstring(content, parser=html.HTMLParser(encoding=encoding))
+    except etree.ParserError as e:
+        # e.g. a page holding only a comment or XML declaration
+        print(f"  Error parsing page: {e}")
+        return verses
+    
+    # Find all verse headers (they're h2 tags with links)
+    for header in tree.iter('h2'):
         try:
-            response = requests.get(url)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Get the reference from the link
+            link = header.find('.//a')
+            if link is None:
+                continue
             
-            # Find all verse headers (they're h2 tags with links)
-            verse_headers = soup.find_all('h2')
+            reference = link.text_content().strip()
             
-            for header in verse_headers:
-                try:
-                    # Get the reference from the link
-                    link = header.find('a')
-                    if not link:
-                        continue
-                    
-                    reference = link.text.strip()
-                    
-                    # Find the verse text container
-                    next_elem = header.find_next_sibling()
-                    
-                    # Skip the "Bible Rank: X" element
-                    while next_elem and 'Bible Rank' in next_elem.text:
-                        next_elem = next_elem.find_next_sibling()
-                    
-                    # Get the full text and extract only NIV portion
-                    if next_elem:
-                        full_text = next_elem.get_text()
-                        
-                        # Split by translation markers and get the first part (before NIV marker)
-                        # The NIV text comes first, before the "NIV" label
-                        lines = full_text.split('\n')
-                        niv_text = []
-                        
-                        for line in lines:
-                            line = line.strip()
-                            # Stop when we hit the NIV marker (that's the end of NIV text)
-                            if line == 'NIV' or line == 'AMP' or line == 'KJV':
-                                break
-                            if line:  # Only add non-empty lines
-                                niv_text.append(line)
-                        
-                        verse_text = ' '.join(niv_text).strip()
-                        
-                        if verse_text and reference:
-                            verses.append({
-                                'reference': reference,
-                                'text': verse_text
-                            })
-                            
-                            print(f"  Added: {reference}")
-                            #print(f"    Text: {verse_text[:60]}...")
-                    
-                except Exception as e:
-                    print(f"  Error parsing verse: {e}")
-                    continue
+            # Find the verse text container, skipping the "Bible Rank: X" element
+            next_elems = _VERSE_ELEM_XPATH(header)
             
-            # Be respectful with scraping - add delay between requests
-            time.sleep(0.5)
+            # Get the full text and extract only NIV portion
+            if next_elems:
+                full_text = next_elems[0].text_content()
+                
+                # The NIV text comes first, up to the line holding just the
+                # translation label; collapse its line breaks and spacing
+                verse_text = ' '.join(_NIV_RE.match(full_text).group(1).split())
+                
+                if verse_text and reference:
+                    verses.append({
+                        'reference': reference,
+                        'text': verse_text
+                    })
             
-        except requests.RequestException as e:
-            print(f"Error fetching page {page}: {e}")
+        except Exception as e:
+            print(f"  Error parsing verse: {e}")
             continue
     
-    # Save to CSV
-    print(f"\nSaving {len(verses)} verses to bible_verses.csv...")
-    with open('bible_verses.csv', 'w', newline='', encoding='utf-8') as f:
+    return verses
+
+def fetch_page(session, page):
+    """Fetch one page of results and parse its verses"""
+    url = BASE_URL.format(page)
+    
+    with _request_slots:
+        response = session.get(url)
+        # Be respectful with scraping - add delay between requests
+        time.sleep(0.1)
+    
+    response.raise_for_status()
+    
+    # Trust a charset only if the server declared one; default to UTF-8
+    content_type = response.headers.get('Content-Type', '').lower()
+    encoding = response.encoding if 'charset=' in content_type else 'utf-8'
+    return parse_verses(response.content, encoding)
+
+def scrape_bible_verses():
+    """Scrape top 1000 Bible verses from topverses.com and save to CSV"""
+    
+    # One keep-alive session shared by all workers
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=MAX_WORKERS, pool_maxsize=MAX_WORKERS)
+    session.mount('https://', adapter)
+    
+    count = 0
+    with open('bible_verses.csv', 'w', newline='', encoding='utf-8', buffering=1 << 20) as f:
         writer = csv.DictWriter(f, fieldnames=['reference', 'text'])
         writer.writeheader()
-        writer.writerows(verses)
+        
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            # Only a bounded window of pages is submitted ahead of the writer,
+            # and each page's future is dropped once it has been written
+            pages = iter(PAGES)
+            pending = deque(
+                (page, executor.submit(fetch_page, session, page))
+                for page in islice(pages, MAX_PAGES_AHEAD)
+            )
+            
+            # Write each page as soon as it and every page before it are done,
+            # so the CSV keeps the site's ranking order
+            while pending:
+                page, future = pending.popleft()
+                for next_page in islice(pages, 1):
+                    pending.append((next_page, executor.submit(fetch_page, session, next_page)))
+                
+                try:
+                    verses = future.result()
+                except requests.RequestException as e:
+                    print(f"Error fetching page {page}: {e}")
+                    continue
+                
+                print(f"Scraped page {page}/{len(PAGES)}...")
+                for verse in verses:
+                    writer.writerow(verse)
+                    count += 1
+                    print(f"  Added: {verse['reference']}")
+                    #print(f"    Text: {verse['text'][:60]}...")
+                    
+                    # Flush periodically so an interrupted scrape keeps its progress
+                    if count % 50 == 0:
+                        f.flush()
     
+    print(f"\nSaved {count} verses to bible_verses.csv")
     print("Done!")
-    return len(verses)
+    return count
 
 if __name__ == "__main__":
     count = scrape_bible_verses()
     print(f"\nSuccessfully scraped {count} Bible verses (NIV only)")
-    print("Saved to: bible_verses.csv")
\ No newline at end of file
+    print("Saved to: bible_verses.csv")
@@ -0,0 +1,15 @@
+from scraper import parse_verses
+
+
+def test_parse_verses_decodes_utf8_fragment():
+    content = (
+        '<h2><a href="/v">Ephesians 2:8</a></h2>'
+        '<div>Bible Rank: 26</div>'
+        '<div>“For it is by grace you have been saved – through faith”\n'
+        'NIV\nOther text\n</div>'
+    ).encode('utf-8')
+    
+    assert parse_verses(content) == [{
+        'reference': 'Ephesians 2:8',
+        'text': '“For it is by grace you have been saved – through faith”',
+    }]